@@ -0,0 +1,156 @@
+import asyncio
+import json
+import re
+from collections import deque
+from pathlib import Path
+
+# -------------------- Configuration --------------------
+AUTOMOD_FILE = Path("automod.json")
+
+DEFAULT_CONFIG = {
+    "words": [],
+    "block_invites": True,
+    "block_links": False,
+    "max_mentions": 5,       # most mentions allowed in one message, 0 disables
+    "actions": ["delete", "warn"],
+    "mute_after": 3,         # auto-mute once a member reaches this many warns, 0 disables
+}
+
+INVITE_RE = re.compile(r"(?:discord(?:app)?\.com/invite|discord\.gg)/[\w-]+", re.IGNORECASE)
+LINK_RE = re.compile(r"https?://\S+", re.IGNORECASE)
+# -------------------------------------------------------
+
+
+class WordFilter:
+    """Aho-Corasick automaton over a wordlist.
+
+    A scan walks each character of the message once, so the cost depends on
+    the message length, not on how many words are banned.
+    """
+
+    def __init__(self, words=()):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for word in words:
+            word = word.strip().lower()
+            if word:
+                self._insert(word)
+        self._link()
+
+    def _insert(self, word):
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            node = nxt
+        self.out[node] = (len(word),)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+                queue.append(child)
+
+    def find(self, text: str):
+        """Return the first banned word found as a whole word in text, or None."""
+        goto, fail, out = self.goto, self.fail, self.out
+        text = text.lower()
+        end = len(text)
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            # only whole words, so "class" doesn't trip on "ass"
+            if not out[node] or (i + 1 < end and text[i + 1].isalnum()):
+                continue
+            for length in out[node]:
+                start = i - length + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    return text[start:i + 1]
+        return None
+
+
+class AutoMod:
+    """Per-guild automod settings plus a WordFilter for each guild.
+
+    Filters are built at startup and, after a wordlist edit, rebuilt off the
+    event loop by rebuild() and swapped in, so check() never pays for a build.
+    """
+
+    def __init__(self, path: Path = AUTOMOD_FILE):
+        self.path = Path(path)
+        self.data = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        self._filters = {gid: WordFilter(cfg.get("words", [])) for gid, cfg in self.data.items()}
+        self._versions = {}
+
+    def save(self):
+        self.path.write_text(json.dumps(self.data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def config(self, guild_id) -> dict:
+        return {**DEFAULT_CONFIG, **self.data.get(str(guild_id), {})}
+
+    def update(self, guild_id, **changes):
+        self.data.setdefault(str(guild_id), {}).update(changes)
+        if "words" in changes:
+            self._versions[str(guild_id)] = self._versions.get(str(guild_id), 0) + 1
+        self.save()
+
+    def add_words(self, guild_id, words):
+        current = self.config(guild_id)["words"]
+        known = set(current)
+        added = [w for w in dict.fromkeys(w.strip().lower() for w in words) if w and w not in known]
+        if added:
+            self.update(guild_id, words=current + added)
+        return added
+
+    def remove_words(self, guild_id, words):
+        current = self.config(guild_id)["words"]
+        drop = {w.strip().lower() for w in words}
+        removed = [w for w in current if w in drop]
+        if removed:
+            self.update(guild_id, words=[w for w in current if w not in drop])
+        return removed
+
+    async def rebuild(self, guild_id):
+        """Build the guild's filter in a worker thread, then swap it in.
+
+        The old filter keeps serving check() until the new one is ready. If
+        the wordlist changed again meanwhile, the stale build is dropped.
+        """
+        gid = str(guild_id)
+        version = self._versions.get(gid, 0)
+        wf = await asyncio.to_thread(WordFilter, self.config(gid)["words"])
+        if self._versions.get(gid, 0) == version:
+            self._filters[gid] = wf
+
+    def check(self, guild_id, content: str, mention_count: int = 0):
+        """Return (rule, detail) if the message breaks a rule, else None.
+
+        rule is safe to show in public; detail may contain the banned word.
+        """
+        cfg = self.config(guild_id)
+        if cfg["max_mentions"] > 0 and mention_count > cfg["max_mentions"]:
+            return "mention flood", f"{mention_count} mentions"
+        if cfg["block_invites"] and INVITE_RE.search(content):
+            return "invite link", None
+        if cfg["block_links"] and LINK_RE.search(content):
+            return "link", None
+        wf = self._filters.get(str(guild_id))
+        if cfg["words"] and wf is not None:
+            word = wf.find(content)
+            if word:
+                return "banned word", word
+        return None
@@ -0,0 +1,66 @@
+"""Throughput benchmark for the automod word filter.
+
+Run: python bench_automod.py
+Each scan is one pass over the message, so growing the wordlist by 1000x
+should only cost a small constant factor (a bigger trie), not 1000x.
+"""
+import asyncio
+import random
+import string
+import time
+
+from automod import AutoMod, WordFilter
+
+MESSAGES = 2000
+MESSAGE_LEN = 300
+LIST_SIZES = (10, 100, 1_000, 10_000, 50_000)
+
+
+def random_word(rng, lo=4, hi=10):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(lo, hi)))
+
+
+def make_messages(rng):
+    messages = []
+    for _ in range(MESSAGES):
+        words = []
+        while sum(len(w) + 1 for w in words) < MESSAGE_LEN:
+            words.append(random_word(rng, 2, 8))
+        messages.append(" ".join(words))
+    return messages
+
+
+def bench_filter(size, messages, rng):
+    start = time.perf_counter()
+    wf = WordFilter(random_word(rng) for _ in range(size))
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for msg in messages:
+        wf.find(msg)
+    scan = time.perf_counter() - start
+
+    chars = sum(len(m) for m in messages)
+    print(f"{size:>7} words | build {build * 1000:8.1f} ms | "
+          f"{len(messages) / scan:9.0f} msg/s | {chars / scan / 1e6:6.2f} Mchar/s")
+
+
+def bench_check(messages, rng, tmp_path="bench_automod.json"):
+    # full check() path: mentions, invite regex and word filter
+    automod = AutoMod(tmp_path)
+    automod.data = {"1": {"words": [random_word(rng) for _ in range(1_000)]}}
+    asyncio.run(automod.rebuild(1))
+    start = time.perf_counter()
+    for msg in messages:
+        automod.check(1, msg, 0)
+    scan = time.perf_counter() - start
+    print(f"AutoMod.check (1000 words, invites on) | {len(messages) / scan:9.0f} msg/s")
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    messages = make_messages(rng)
+    print(f"{MESSAGES} messages x ~{MESSAGE_LEN} chars")
+    for size in LIST_SIZES:
+        bench_filter(size, messages, rng)
+    bench_check(messages, rng)
@@ -58,31 +58,85 @@ DATA_FILE = "reaction_roles.json"
 # =====================
 # MEMORY BUFFER
 # =====================
-conversation_history = defaultdict(lambda: deque(maxlen=4))
+# Giữ nguyên văn N lượt gần nhất, các lượt cũ hơn được gộp vào bản tóm tắt
+KEEP_RECENT_TURNS = 6
+HISTORY_TOKEN_BUDGET = 1200   # trần token cho phần lịch sử trong prompt
+SUMMARY_TOKEN_BUDGET = 300    # trần token cho bản tóm tắt
+SUMMARY_BATCH = 8             # đủ bấy nhiêu lượt cũ mới gọi tóm tắt lại
+MAX_PENDING_TURNS = 24        # backlog đầy thì tóm tắt ngay; nếu tóm tắt đang lỗi thì bỏ bớt lượt cũ nhất
+SUMMARY_RETRY_AFTER = 300     # tóm tắt lỗi thì đợi bấy nhiêu giây mới thử lại
+
+conversation_history = defaultdict(deque)   # user_id -> các lượt gần nhất
+pending_turns = defaultdict(list)           # user_id -> lượt cũ chưa được tóm tắt
+conversation_summary = {}                   # user_id -> bản tóm tắt cuộn
+summary_tasks = {}                          # user_id -> task tóm tắt đang chạy
+summary_retry_after = {}                    # user_id -> thời điểm được thử tóm tắt lại
+pending_trimmed = defaultdict(int)          # user_id -> số lượt đã bị cắt khỏi đầu pending
+prompt_token_stats = {}                     # user_id -> số token prompt lần gần nhất
 
 # =====================
 # GEMINI FUNCTIONS
 # =====================
 
+REQUEST_INTERVAL = 6         # 10 req/phút ≈ 1 req/6 giây
+SUMMARY_IDLE = 12            # chỉ tóm tắt khi đã rảnh >= 2 khoảng reply
+SUMMARY_MIN_INTERVAL = 60    # tối đa 1 lần tóm tắt mỗi phút
+
+rate_lock = asyncio.Lock()
+replies_active = 0           # số reply đang chờ hoặc đang gọi Gemini
 last_request_time = 0
+last_summary_time = 0
 
-async def get_ai_response(prompt: str) -> str:
-    global last_request_time
+async def call_gemini(prompt: str, usage: dict = None) -> str:
+    loop = asyncio.get_event_loop()
+    response = await loop.run_in_executor(
+        None,
+        lambda: genai.GenerativeModel("gemini-2.5-flash").generate_content(prompt)
+    )
+    if usage is not None:
+        meta = getattr(response, "usage_metadata", None)
+        usage["prompt_tokens"] = getattr(meta, "prompt_token_count", None)
+    return response.text.strip()
+
+async def get_ai_response(prompt: str, usage: dict = None) -> str:
+    global last_request_time, replies_active
+    replies_active += 1
     try:
-        now = time.time()
-        if now - last_request_time < 6:  # 10 req/phút ≈ 1 req/6 giây
-            await asyncio.sleep(6 - (now - last_request_time))
-
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: genai.GenerativeModel("gemini-2.5-flash").generate_content(prompt)
-        )
-        last_request_time = time.time()
-        return response.text.strip()
+        # Lock giữ nhịp 1 req / REQUEST_INTERVAL giữa các reply
+        async with rate_lock:
+            wait = last_request_time + REQUEST_INTERVAL - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            last_request_time = time.time()
+        return await call_gemini(prompt, usage)
     except Exception as e:
         print("❌ Gemini error:", e)
         return "Em bị giới hạn quota, thử lại sau nhé 💕"
+    finally:
+        replies_active -= 1
+
+async def wait_for_summary_slot(user_id: int):
+    # Bình thường tóm tắt không đụng last_request_time nên không làm reply phải chờ.
+    # Nó chỉ chạy khi không có reply nào và bot đã rảnh SUMMARY_IDLE giây, tức là
+    # đã bỏ trống ít nhất 1 lượt reply, nên tổng vẫn nằm trong quota mỗi phút.
+    global last_request_time, last_summary_time
+    while True:
+        now = time.time()
+        if (not replies_active
+                and now - last_request_time >= SUMMARY_IDLE
+                and now - last_summary_time >= SUMMARY_MIN_INTERVAL):
+            last_summary_time = now
+            return
+        if len(pending_turns.get(user_id, ())) >= MAX_PENDING_TURNS:
+            # Backlog đầy mà bot vẫn bận: chen vào nhịp chung như một reply
+            # để không phải bỏ lượt nào chưa được tóm tắt
+            async with rate_lock:
+                wait = last_request_time + REQUEST_INTERVAL - time.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                last_request_time = last_summary_time = time.time()
+            return
+        await asyncio.sleep(2)
 
 def split_sentences(text: str):
     sentences = re.split(r'(?<=[.!?])\s+', text.strip())
@@ -94,6 +148,121 @@ def limit_exact_sentences(text: str, is_special_user: bool = False):
     return " ".join(sentences[:target_count]) if len(sentences) >= target_count else " ".join(sentences)
 
 
+# =====================
+# CONVERSATION MEMORY
+# =====================
+def estimate_tokens(text: str) -> int:
+    # Ước lượng thô, tiếng Việt có dấu thường ~3 ký tự / token
+    return len(text) // 3 + 1
+
+def history_name(user_id: int) -> str:
+    return lover_nickname if user_id == SPECIAL_USER_ID else "Người dùng"
+
+def format_turn(role: str, text: str, user_name: str) -> str:
+    return f"{user_name}: {text}\n" if role == "user" else f"Bot: {text}\n"
+
+def remember_turn(user_id: int, role: str, text: str):
+    recent = conversation_history[user_id]
+    recent.append((role, text))
+    while len(recent) > KEEP_RECENT_TURNS:
+        pending_turns[user_id].append(recent.popleft())
+
+    pending = pending_turns[user_id]
+    retry_at = summary_retry_after.get(user_id)
+    if retry_at is not None and time.time() >= retry_at:
+        del summary_retry_after[user_id]
+        retry_at = None
+
+    if retry_at is None:
+        if len(pending) >= SUMMARY_BATCH:
+            schedule_summary(user_id)
+    elif len(pending) > MAX_PENDING_TURNS:
+        # Chỉ bỏ lượt cũ khi tóm tắt vừa lỗi, không phải vì nó đang chờ lượt
+        trim = len(pending) - MAX_PENDING_TURNS
+        del pending[:trim]
+        pending_trimmed[user_id] += trim
+
+def build_history_text(user_id: int, user_name: str):
+    """Ghép lịch sử trong giới hạn token: tóm tắt + lượt chưa tóm tắt + lượt gần nhất."""
+    budget = HISTORY_TOKEN_BUDGET
+    summary = conversation_summary.get(user_id, "")
+    if summary:
+        summary = summary[:SUMMARY_TOKEN_BUDGET * 3]
+        summary_text = f"(Tóm tắt trước đó: {summary})\n"
+        budget -= estimate_tokens(summary_text)
+    else:
+        summary_text = ""
+
+    # Ưu tiên lượt mới nhất, dừng khi hết ngân sách
+    lines = []
+    turns = list(pending_turns.get(user_id, [])) + list(conversation_history.get(user_id, []))
+    for role, text in reversed(turns):
+        line = format_turn(role, text, user_name)
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        budget -= cost
+        lines.append(line)
+
+    history_text = summary_text + "".join(reversed(lines))
+    return history_text, HISTORY_TOKEN_BUDGET - budget
+
+def schedule_summary(user_id: int):
+    task = summary_tasks.get(user_id)
+    if task and not task.done():
+        return
+    task = summary_tasks[user_id] = asyncio.create_task(refresh_summary(user_id))
+
+    def done(t):
+        if summary_tasks.get(user_id) is t:
+            del summary_tasks[user_id]
+    task.add_done_callback(done)
+
+async def refresh_summary(user_id: int):
+    # Chạy nền, không giữ processing_lock nên không chặn việc trả lời
+    await wait_for_summary_slot(user_id)
+    folded = list(pending_turns.get(user_id, []))
+    if not folded:
+        return
+    trimmed_before = pending_trimmed[user_id]
+    old_summary = conversation_summary.get(user_id, "")
+    turns_text = "".join(format_turn(role, text, history_name(user_id)) for role, text in folded)
+    prompt = (
+        "Tóm tắt ngắn gọn cuộc trò chuyện dưới đây (tối đa 4 câu), giữ lại thông tin quan trọng "
+        "về người dùng: tên, sở thích, chuyện đã kể, lời hứa. Không thêm lời dẫn.\n\n"
+        f"Tóm tắt cũ:\n{old_summary or '(chưa có)'}\n\n"
+        f"Đoạn hội thoại mới:\n{turns_text}"
+    )
+    try:
+        summary = await call_gemini(prompt)
+    except Exception as e:
+        # Giữ lại các lượt, đợi một lúc rồi mới tóm tắt tiếp
+        print("❌ Gemini summary error:", e)
+        summary_retry_after[user_id] = time.time() + SUMMARY_RETRY_AFTER
+        return
+
+    # Memory có thể đã bị reset trong lúc chờ Gemini
+    pending = pending_turns.get(user_id)
+    if pending is None:
+        return
+    # Lượt nào bị cắt khỏi đầu pending trong lúc chờ thì đã nằm trong bản tóm tắt
+    trimmed = pending_trimmed[user_id] - trimmed_before
+    del pending[:max(0, len(folded) - trimmed)]
+    if summary != old_summary:
+        conversation_summary[user_id] = summary
+
+def forget_user(user_id: int):
+    task = summary_tasks.pop(user_id, None)
+    if task:
+        task.cancel()
+    conversation_history.pop(user_id, None)
+    pending_turns.pop(user_id, None)
+    pending_trimmed.pop(user_id, None)
+    summary_retry_after.pop(user_id, None)
+    conversation_summary.pop(user_id, None)
+    prompt_token_stats.pop(user_id, None)
+
+
 # =====================
 # SAVE / LOAD WAR DATA
 # =====================
@@ -237,16 +406,10 @@ async def on_message(message: discord.Message):
         user_message = message.content.replace(f"<@{bot.user.id}>", "").strip()[:300]
 
         # Lưu lịch sử user
-        conversation_history[message.author.id].append(("user", user_message))
+        remember_turn(message.author.id, "user", user_message)
 
-        # Ghép lịch sử hội thoại
-        history_text = ""
-        for role, text in conversation_history[message.author.id]:
-            if role == "user":
-                name = lover_nickname if message.author.id == SPECIAL_USER_ID else "Người dùng"
-                history_text += f"{name}: {text}\n"
-            else:
-                history_text += f"Bot: {text}\n"
+        # Ghép lịch sử hội thoại (giới hạn token)
+        history_text, history_tokens = build_history_text(message.author.id, history_name(message.author.id))
 
         # Prompt
         if message.author.id == SPECIAL_USER_ID:
@@ -311,11 +474,20 @@ async def on_message(message: discord.Message):
             is_special = False
 
         async with processing_lock:
-            ai_reply = await get_ai_response(prompt)
+            usage = {}
+            ai_reply = await get_ai_response(prompt, usage)
             ai_reply = limit_exact_sentences(ai_reply, is_special)
 
+            stats = {
+                "history_tokens": history_tokens,
+                "prompt_tokens_est": estimate_tokens(prompt),
+                "prompt_tokens": usage.get("prompt_tokens"),
+            }
+            prompt_token_stats[message.author.id] = stats
+            print(f"📏 Prompt {message.author.id}: {stats}")
+
             # Lưu reply bot
-            conversation_history[message.author.id].append(("bot", ai_reply))
+            remember_turn(message.author.id, "bot", ai_reply)
 
             await message.channel.send(ai_reply)
 
@@ -343,8 +515,8 @@ async def clearchannel(interaction: discord.Interaction):
 @bot.tree.command(name="resetmemory", description="Xoá lịch sử hội thoại của bạn với bot")
 async def resetmemory(interaction: discord.Interaction):
     user_id = interaction.user.id
-    if user_id in conversation_history:
-        conversation_history[user_id].clear()
+    if user_id in conversation_history or user_id in conversation_summary:
+        forget_user(user_id)
         await interaction.response.send_message("🧹 Lịch sử hội thoại của bạn đã được xoá sạch!", ephemeral=True)
     else:
         await interaction.response.send_message("❌ Bạn chưa có lịch sử hội thoại nào để xoá.", ephemeral=True)
@@ -353,9 +525,33 @@ async def resetmemory(interaction: discord.Interaction):
 async def resetallmemory(interaction: discord.Interaction):
     if not interaction.user.guild_permissions.administrator:
         return await interaction.response.send_message("❌ Chỉ admin mới có thể dùng lệnh này.", ephemeral=True)
+    for user_id in list(summary_tasks):
+        forget_user(user_id)
     conversation_history.clear()
+    pending_turns.clear()
+    pending_trimmed.clear()
+    summary_retry_after.clear()
+    conversation_summary.clear()
+    prompt_token_stats.clear()
     await interaction.response.send_message("🧹 Toàn bộ lịch sử hội thoại đã được xoá sạch!", ephemeral=True)
 
+@bot.tree.command(name="memorystats", description="Xem bộ nhớ hội thoại và số token prompt gần nhất")
+async def memorystats(interaction: discord.Interaction):
+    user_id = interaction.user.id
+    stats = prompt_token_stats.get(user_id)
+    if not stats:
+        return await interaction.response.send_message("❌ Bạn chưa có lịch sử hội thoại nào.", ephemeral=True)
+    summary = conversation_summary.get(user_id, "")
+    await interaction.response.send_message(
+        f"📏 Prompt gần nhất: ~{stats['prompt_tokens_est']} token (ước lượng), "
+        f"Gemini báo: {stats['prompt_tokens'] or 'N/A'}\n"
+        f"🧠 Lịch sử: ~{stats['history_tokens']}/{HISTORY_TOKEN_BUDGET} token, "
+        f"{len(conversation_history.get(user_id, []))} lượt gần nhất, "
+        f"{len(pending_turns.get(user_id, []))} lượt chờ tóm tắt\n"
+        f"📝 Tóm tắt: {summary or '(chưa có)'}",
+        ephemeral=True,
+    )
+
 # =====================
 # PING TEST
 # =====================
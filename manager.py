@@ -5,6 +5,8 @@ import os
 import json
 from pathlib import Path
 
+from automod import AutoMod
+
 # -------------------- Configuration --------------------
 PREFIX = "?"
 WARN_FILE = Path("warns.json")
@@ -16,6 +18,7 @@ intents.message_content = True
 intents.members = True  # required for on_member_join and member operations
 
 bot = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None)
+automod = AutoMod()
 
 # -------------------- Helpers --------------------
 
@@ -29,6 +32,15 @@ def save_warns(data):
     WARN_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
 
 
+def add_warn(guild_id: int, member_id: int, by_id: int, reason: str):
+    """Store a warn and return the member's total warn count in that guild."""
+    data = load_warns()
+    user_warns = data.setdefault(str(guild_id), {}).setdefault(str(member_id), [])
+    user_warns.append({"by": str(by_id), "reason": reason})
+    save_warns(data)
+    return len(user_warns)
+
+
 async def get_or_create_channel(guild: discord.Guild, name: str, *, category=None):
     for ch in guild.text_channels:
         if ch.name == name:
@@ -66,6 +78,37 @@ async def on_member_join(member: discord.Member):
     await welcome_channel.send(f"Welcome {member.mention}! Say hi 👋")
 
 
+async def run_automod(message: discord.Message):
+    """Check a message against automod and punish it. Returns True on a hit."""
+    # moderators are exempt
+    if message.guild is None or not isinstance(message.author, discord.Member) \
+            or message.author.guild_permissions.manage_messages:
+        return False
+    mentions = len(message.raw_mentions) + len(message.raw_role_mentions) + message.mention_everyone
+    hit = automod.check(message.guild.id, message.content, mentions)
+    if hit:
+        await automod_punish(message, *hit)
+    return bool(hit)
+
+
+@bot.event
+async def on_message(message: discord.Message):
+    if message.author.bot:
+        return
+    # automod runs before commands
+    if await run_automod(message):
+        return
+    await bot.process_commands(message)
+
+
+@bot.event
+async def on_message_edit(before: discord.Message, after: discord.Message):
+    # embed unfurls also fire edits; only re-check when the text changed
+    if after.author.bot or before.content == after.content:
+        return
+    await run_automod(after)
+
+
 # -------------------- Basic Commands --------------------
 
 @bot.command(name="ping")
@@ -80,6 +123,7 @@ async def help_cmd(ctx):
     embed.add_field(name="Moderation", value="?kick @user [reason]\n?ban @user [reason]\n?unban user#1234", inline=False)
     embed.add_field(name="Utility", value="?clear <num>\n?userinfo @user\n?serverinfo", inline=False)
     embed.add_field(name="Role/Lock", value="?mute @user\n?unmute @user\n?lock\n?unlock", inline=False)
+    embed.add_field(name="Automod", value="?addword <words>\n?removeword <words>\n?wordlist\n?automod [setting] [value]", inline=False)
     embed.set_footer(text="Prefix: ?")
     await ctx.send(embed=embed)
 
@@ -179,12 +223,7 @@ async def unmute(ctx, member: discord.Member):
 @bot.command(name="warn")
 @commands.has_permissions(manage_messages=True)
 async def warn(ctx, member: discord.Member, *, reason: str = "No reason provided"):
-    data = load_warns()
-    gid = str(ctx.guild.id)
-    data.setdefault(gid, {})
-    user_warns = data[gid].setdefault(str(member.id), [])
-    user_warns.append({"by": str(ctx.author.id), "reason": reason})
-    save_warns(data)
+    add_warn(ctx.guild.id, member.id, ctx.author.id, reason)
     await ctx.send(f"⚠️ Warned {member}: {reason}")
     await log_action(ctx.guild, f"{ctx.author} warned {member} — {reason}")
 
@@ -207,6 +246,132 @@ async def warns(ctx, member: discord.Member = None):
     await ctx.send(embed=embed)
 
 
+# -------------------- Automod --------------------
+
+AUTOMOD_SETTINGS = ("block_invites", "block_links", "max_mentions", "mute_after", "actions")
+AUTOMOD_ACTIONS = ("delete", "warn", "mute")
+
+
+async def automod_punish(message: discord.Message, rule: str, detail: str = None):
+    guild, member = message.guild, message.author
+    cfg = automod.config(guild.id)
+    actions = cfg["actions"]
+    # the detail can be the banned word itself, so it stays out of the channel
+    reason = f"{rule} ({detail})" if detail else rule
+
+    if "delete" in actions:
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            pass
+
+    warn_count = 0
+    if "warn" in actions:
+        warn_count = add_warn(guild.id, member.id, bot.user.id, f"[automod] {reason}")
+        await message.channel.send(f"⚠️ {member.mention} warned: {rule}", delete_after=10)
+
+    note = ""
+    if "mute" in actions or (cfg["mute_after"] and warn_count >= cfg["mute_after"]):
+        try:
+            role = await ensure_muted_role(guild)
+            if role not in member.roles:
+                await member.add_roles(role, reason=f"[automod] {rule}")
+                await message.channel.send(f"🔇 Muted {member.mention}", delete_after=10)
+        except discord.HTTPException as e:
+            note = f" — mute failed: {e}"
+
+    await log_action(guild, f"[automod] {member} in #{message.channel.name} — {reason} ({', '.join(actions)}){note}")
+
+
+@bot.command(name="addword")
+@commands.has_permissions(manage_messages=True)
+async def addword(ctx, *words: str):
+    added = automod.add_words(ctx.guild.id, words)
+    if not added:
+        await ctx.send("Nothing new to add")
+        return
+    await automod.rebuild(ctx.guild.id)
+    try:
+        await ctx.message.delete()  # don't leave the words sitting in chat
+    except discord.HTTPException:
+        pass
+    await ctx.send(f"✅ Added {len(added)} word(s) to the filter", delete_after=5)
+    await log_action(ctx.guild, f"{ctx.author} added {len(added)} word(s) to the automod filter")
+
+
+@bot.command(name="removeword")
+@commands.has_permissions(manage_messages=True)
+async def removeword(ctx, *words: str):
+    removed = automod.remove_words(ctx.guild.id, words)
+    if not removed:
+        await ctx.send("None of those words are in the filter")
+        return
+    await automod.rebuild(ctx.guild.id)
+    await ctx.send(f"✅ Removed {len(removed)} word(s) from the filter", delete_after=5)
+    await log_action(ctx.guild, f"{ctx.author} removed {len(removed)} word(s) from the automod filter")
+
+
+@bot.command(name="wordlist")
+@commands.has_permissions(manage_messages=True)
+async def wordlist(ctx):
+    words = automod.config(ctx.guild.id)["words"]
+    if not words:
+        await ctx.send("The word filter is empty")
+        return
+    # DM so the list isn't posted in a public channel
+    try:
+        await ctx.author.send(f"Filtered words in {ctx.guild.name}: " + ", ".join(words)[:1900])
+    except discord.HTTPException:
+        await ctx.send("❌ I can't DM you — open your DMs and try again")
+        return
+    await ctx.send("📬 Sent you the word list in DMs", delete_after=5)
+
+
+@bot.command(name="automod")
+@commands.has_permissions(manage_guild=True)
+async def automod_cmd(ctx, setting: str = None, *, value: str = None):
+    if setting is None:
+        cfg = automod.config(ctx.guild.id)
+        embed = discord.Embed(title="Automod settings", color=discord.Color.blurple())
+        for key in AUTOMOD_SETTINGS:
+            shown = (", ".join(cfg[key]) or "none") if key == "actions" else cfg[key]
+            embed.add_field(name=key, value=str(shown), inline=True)
+        embed.add_field(name="words", value=str(len(cfg["words"])), inline=True)
+        await ctx.send(embed=embed)
+        return
+
+    if setting not in AUTOMOD_SETTINGS or value is None:
+        await ctx.send(f"❌ Usage: ?automod <{'|'.join(AUTOMOD_SETTINGS)}> <value>")
+        return
+
+    if setting in ("block_invites", "block_links"):
+        if value.lower() in ("on", "true", "yes", "1"):
+            parsed = True
+        elif value.lower() in ("off", "false", "no", "0"):
+            parsed = False
+        else:
+            await ctx.send(f"❌ Usage: ?automod {setting} <on|off>")
+            return
+    elif setting == "actions":
+        parsed = [a.strip().lower() for a in value.replace(",", " ").split()]
+        if not parsed or not all(a in AUTOMOD_ACTIONS for a in parsed):
+            await ctx.send(f"❌ Actions must be any of: {', '.join(AUTOMOD_ACTIONS)}")
+            return
+    else:
+        try:
+            parsed = int(value)
+        except ValueError:
+            await ctx.send(f"❌ {setting} must be a number")
+            return
+        if parsed < 0:
+            await ctx.send(f"❌ {setting} must be 0 (off) or more")
+            return
+
+    automod.update(ctx.guild.id, **{setting: parsed})
+    await ctx.send(f"✅ automod {setting} = {value}")
+    await log_action(ctx.guild, f"{ctx.author} set automod {setting} = {value}")
+
+
 # -------------------- Roles & Channel Lock --------------------
 
 @bot.command(name="create_role")